@@ -271,7 +271,7 @@ def write_csv(path: str, rows: List[List[str]], header: Optional[List[str]] = No
     return path
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument('--src', required=True)
     ap.add_argument('--out', required=True)
@@ -280,7 +280,7 @@ def main() -> None:
     ap.add_argument('--apply', action='store_true')
     ap.add_argument('--skip-backup', action='store_true', help='Do not create a fresh backup (assume existing backup present)')
     ap.add_argument('--limit', type=int, default=0, help='If >0, only perform moves for first N planned rows')
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     src = os.path.abspath(args.src)
     out = os.path.abspath(args.out)
@@ -131,11 +131,15 @@ def inspect(path: str) -> None:
     doc.close()
 
 
-if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        files = sys.argv[1:]
-    else:
+def main(argv=None):
+    files = sys.argv[1:] if argv is None else list(argv)
+    if not files:
         print('Usage: inspect_pdf_metadata.py <pdf1> <pdf2> ...')
-        sys.exit(1)
+        return 1
     for f in files:
         inspect(f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
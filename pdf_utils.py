@@ -10,47 +10,48 @@ Common functions used across multiple scripts for:
 - File safety utilities
 """
 
+import csv
+import importlib
+import io
+import json
+import sys
 import tempfile
 import os
+import shutil
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
 
-try:
-    import fitz  # PyMuPDF
-    FITZ_AVAILABLE = True
-except ImportError:
-    FITZ_AVAILABLE = False
-    fitz = None
-
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
-    pdfplumber = None
-
-try:
-    from PyPDF2 import PdfReader, PdfWriter
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
-    PdfReader = None
-    PdfWriter = None
-
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    canvas = None
-
-try:
-    from docx import Document
-    PYTHON_DOCX_AVAILABLE = True
-except ImportError:
-    PYTHON_DOCX_AVAILABLE = False
-    Document = None
+# Optional backends (PyMuPDF, pikepdf, pdfplumber, PyPDF2, python-docx) are imported on
+# first use, so scripts that only need the lightweight helpers here don't pay their import cost.
+_optional_modules: Dict[str, object] = {}
+
+
+def _optional(name: str):
+    """Import an optional dependency once; None if it is not installed."""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except Exception:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+def load_fitz(quiet: bool = False):
+    """
+    Return the PyMuPDF module, or None if it is not installed.
+    
+    Args:
+        quiet: Stop MuPDF printing repair warnings to stderr (worth it in
+            process pools, where every worker contends on stderr)
+    """
+    fitz = _optional('fitz')
+    if fitz is not None and quiet:
+        fitz.TOOLS.mupdf_display_errors(False)
+    return fitz
+
+
+# Per-user cache directory for the metadata caches (see load_meta_cache)
+CACHE_DIR = Path.home() / '.cache' / 'pdf-tools'
 
 
 # ============================================================================
@@ -70,9 +71,11 @@ def extract_text_from_pdf(pdf_path: str, max_pages: Optional[int] = None) -> str
         Extracted text as string (empty string on failure)
     """
     text = ""
+    pdfplumber = _optional('pdfplumber')
+    PyPDF2 = _optional('PyPDF2')
     
     # Try pdfplumber (best quality)
-    if PDFPLUMBER_AVAILABLE:
+    if pdfplumber is not None:
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 pages = pdf.pages[:max_pages] if max_pages else pdf.pages
@@ -83,10 +86,10 @@ def extract_text_from_pdf(pdf_path: str, max_pages: Optional[int] = None) -> str
             print(f"⚠️  pdfplumber failed: {e}, trying PyPDF2...")
     
     # Fallback to PyPDF2
-    if PYPDF2_AVAILABLE:
+    if PyPDF2 is not None:
         try:
             with open(pdf_path, 'rb') as file:
-                pdf = PdfReader(file)
+                pdf = PyPDF2.PdfReader(file)
                 pages = pdf.pages[:max_pages] if max_pages else pdf.pages
                 for page in pages:
                     text += page.extract_text() or ""
@@ -108,7 +111,10 @@ def extract_text_from_page(pdf_path: str, page_num: int) -> str:
     Returns:
         Extracted text from that page
     """
-    if PDFPLUMBER_AVAILABLE:
+    pdfplumber = _optional('pdfplumber')
+    PyPDF2 = _optional('PyPDF2')
+    
+    if pdfplumber is not None:
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 if page_num < len(pdf.pages):
@@ -116,10 +122,10 @@ def extract_text_from_page(pdf_path: str, page_num: int) -> str:
         except Exception:
             pass
     
-    if PYPDF2_AVAILABLE:
+    if PyPDF2 is not None:
         try:
             with open(pdf_path, 'rb') as file:
-                pdf = PdfReader(file)
+                pdf = PyPDF2.PdfReader(file)
                 if page_num < len(pdf.pages):
                     return pdf.pages[page_num].extract_text() or ""
         except Exception:
@@ -132,26 +138,179 @@ def extract_text_from_page(pdf_path: str, page_num: int) -> str:
 # METADATA OPERATIONS
 # ============================================================================
 
-def get_pdf_metadata(path: Path) -> Dict[str, str]:
+def get_pdf_metadata(path) -> Dict[str, str]:
     """
-    Read PDF metadata using PyMuPDF.
+    Read PDF metadata (document info dictionary).
+    
+    Uses pikepdf when installed: it reads just the trailer, xref and /Info,
+    much cheaper than a full fitz.open. Files pikepdf rejects get a second
+    chance through PyMuPDF, whose repair copes with more damage. Safe to
+    call from process pool workers (MuPDF warnings are silenced).
     
     Args:
-        path: Path to PDF file
+        path: Path to PDF file (str or Path)
     
     Returns:
-        Dictionary of metadata (lowercase keys)
+        Dictionary of metadata (lowercase keys, stripped values);
+        {"_error": message} if the file could not be read, {} if neither
+        library is installed
     """
-    if not FITZ_AVAILABLE:
+    path = str(path)
+    pikepdf = _optional('pikepdf')
+    if pikepdf is not None:
+        try:
+            with pikepdf.open(path, access_mode=pikepdf.AccessMode.mmap) as pdf:
+                return {str(k).lstrip("/").lower(): str(v).strip() for k, v in pdf.docinfo.items()}
+        except Exception as e:
+            if load_fitz() is None:
+                return {"_error": str(e)}
+    
+    fitz = load_fitz(quiet=True)
+    if fitz is None:
         return {}
     
+    doc = None
     try:
-        doc = fitz.open(str(path))
+        doc = fitz.open(path)
         metadata = doc.metadata or {}
-        doc.close()
         return {k.lower(): (v or "").strip() for k, v in metadata.items()}
     except Exception as e:
         return {"_error": str(e)}
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def get_pdf_metadata_many(paths: List[str], workers: int = 1,
+                          cache_path: Optional[Path] = None) -> List[Dict[str, str]]:
+    """
+    get_pdf_metadata() for many files, in input order.
+    
+    Each distinct file is read once. With cache_path, files whose mtime and
+    size match their cache entry are not opened at all, and new results are
+    written back (read errors are never cached). The rest are read in a
+    process pool when workers > 1 (PyMuPDF is not thread-safe).
+    
+    Args:
+        paths: PDF paths; repeats are fine
+        workers: Worker processes for the reads (1 = serial)
+        cache_path: Optional JSON cache file (see load_meta_cache)
+    
+    Returns:
+        One metadata dict per input path; cached results carry only
+        'author' and 'title'
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    
+    if not paths:
+        return []
+    if cache_path is not None and _optional('pikepdf') is None and load_fitz() is None:
+        cache_path = None  # nothing to read with, so nothing worth caching
+    cache = load_meta_cache(cache_path) if cache_path is not None else {}
+    
+    by_key: Dict[str, List[int]] = {}
+    for i, p in enumerate(paths):
+        by_key.setdefault(os.path.abspath(p), []).append(i)
+    keys = list(by_key)
+    # the stats are independent blocking I/O: overlap them in threads to keep the disk busy
+    if len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=32) as ex:
+            stats = list(ex.map(stat_or_none, keys))
+    else:
+        stats = [stat_or_none(k) for k in keys]
+    
+    results: List[Optional[Dict[str, str]]] = [None] * len(paths)
+    misses = []
+    for key, st in zip(keys, stats):
+        hit = cache.get(key) if st is not None else None
+        if hit and hit.get("mtime_ns") == st.st_mtime_ns and hit.get("size") == st.st_size:
+            md = {"author": hit.get("author", ""), "title": hit.get("title", "")}
+            for i in by_key[key]:
+                results[i] = md
+        else:
+            misses.append((key, st))
+    
+    todo = [paths[by_key[key][0]] for key, _ in misses]
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            fresh = list(ex.map(get_pdf_metadata, todo, chunksize=32))
+    else:
+        fresh = [get_pdf_metadata(p) for p in todo]
+    
+    dirty = False
+    for (key, st), md in zip(misses, fresh):
+        for i in by_key[key]:
+            results[i] = md
+        if cache_path is not None and st is not None and md and not md.get("_error"):
+            cache[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                          "author": md.get("author", ""), "title": md.get("title", "")}
+            dirty = True
+    if dirty:
+        save_meta_cache(cache, cache_path)
+    return results
+
+
+def load_meta_cache(path: Path) -> dict:
+    """
+    Read a JSON metadata cache ({abspath: entry}).
+    
+    Entries carry the file's mtime_ns and size; callers only trust an
+    entry while both still match the file on disk.
+    
+    Returns:
+        The cache dict (empty if the file is missing or unreadable)
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_meta_cache(cache: dict, path: Path) -> None:
+    """Atomically write a metadata cache (temp file + os.replace); failures only warn."""
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f'.{path.stem}-', dir=str(path.parent))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️  Could not write metadata cache {path}: {e}", file=sys.stderr)
+
+
+def save_in_place(doc, path: Path, allow_rewrite: bool = True) -> None:
+    """
+    Save a metadata-only change on an open fitz document back to path.
+
+    Appends an incremental update (only the changed Info object is written).
+    If the file can't be updated incrementally (e.g. it was repaired on open)
+    and allow_rewrite is set, falls back to a full save into a temp file in
+    the same directory followed by os.replace.
+
+    Raises:
+        Whatever the final save raised; the temp file is removed first
+    """
+    fitz = load_fitz()
+    path = Path(path)
+    try:
+        doc.save(str(path), incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        return
+    except Exception:
+        if not allow_rewrite:
+            raise
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=str(path.parent))
+    os.close(fd)
+    try:
+        doc.save(tmp_name, garbage=4, deflate=True)
+        shutil.copymode(str(path), tmp_name)
+        os.replace(tmp_name, str(path))
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
 
 
 def atomic_write_metadata(path: str, title: Optional[str] = None, 
@@ -169,7 +328,8 @@ def atomic_write_metadata(path: str, title: Optional[str] = None,
         (success: bool, method: str)
         method values: 'incr', 'atomic', or error message
     """
-    if not FITZ_AVAILABLE:
+    fitz = load_fitz()
+    if fitz is None:
         return False, 'pymupdf-missing'
     
     try:
@@ -226,15 +386,16 @@ def merge_pdfs(pdf_paths: List[str], output_path: str) -> bool:
     Returns:
         True on success, False on failure
     """
-    if not PYPDF2_AVAILABLE:
+    PyPDF2 = _optional('PyPDF2')
+    if PyPDF2 is None:
         print("❌ PyPDF2 not available for merging")
         return False
     
     try:
-        writer = PdfWriter()
+        writer = PyPDF2.PdfWriter()
         
         for pdf_path in pdf_paths:
-            reader = PdfReader(pdf_path)
+            reader = PyPDF2.PdfReader(pdf_path)
             for page in reader.pages:
                 writer.add_page(page)
         
@@ -259,7 +420,8 @@ def split_pdf(pdf_path: str, output_dir: str, prefix: str = "page") -> bool:
     Returns:
         True on success, False on failure
     """
-    if not PYPDF2_AVAILABLE:
+    PyPDF2 = _optional('PyPDF2')
+    if PyPDF2 is None:
         print("❌ PyPDF2 not available for splitting")
         return False
     
@@ -267,10 +429,10 @@ def split_pdf(pdf_path: str, output_dir: str, prefix: str = "page") -> bool:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        reader = PdfReader(pdf_path)
+        reader = PyPDF2.PdfReader(pdf_path)
         
         for i, page in enumerate(reader.pages, start=1):
-            writer = PdfWriter()
+            writer = PyPDF2.PdfWriter()
             writer.add_page(page)
             
             output_file = output_path / f"{prefix}-{i:03d}.pdf"
@@ -295,13 +457,14 @@ def extract_pages(pdf_path: str, page_numbers: List[int], output_path: str) -> b
     Returns:
         True on success, False on failure
     """
-    if not PYPDF2_AVAILABLE:
+    PyPDF2 = _optional('PyPDF2')
+    if PyPDF2 is None:
         print("❌ PyPDF2 not available")
         return False
     
     try:
-        reader = PdfReader(pdf_path)
-        writer = PdfWriter()
+        reader = PyPDF2.PdfReader(pdf_path)
+        writer = PyPDF2.PdfWriter()
         
         for page_num in page_numbers:
             if 0 <= page_num < len(reader.pages):
@@ -375,6 +538,87 @@ def word_to_pdf(docx_path: str, pdf_path: str) -> bool:
     return False
 
 
+def word_to_pdf_batch(docx_paths: List[str], outdir: str, workers: int = 1) -> Dict[str, bool]:
+    """
+    Convert several Word documents to PDF with as few LibreOffice runs as possible.
+    
+    LibreOffice startup (1-3s) dominates converting small documents, so the
+    inputs go through one `soffice --headless --convert-to pdf` call. With
+    workers > 1 they are sharded across that many concurrent soffice
+    instances, each with its own user profile so they don't fight over the
+    profile lock. Inputs the batch run fails on are retried one at a time
+    through word_to_pdf(), which also gets them the unoconv fallback; the
+    same happens for every input when LibreOffice is not installed.
+    
+    Args:
+        docx_paths: Paths to .docx/.doc files; their stems must be distinct,
+            since each is written to <outdir>/<stem>.pdf
+        outdir: Directory for the generated PDFs (named <stem>.pdf)
+        workers: Number of concurrent LibreOffice instances
+    
+    Returns:
+        Dict mapping each input path to True if its PDF was produced
+    """
+    import subprocess
+    import shutil
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if not docx_paths:
+        return {}
+    
+    def target(p: str) -> Path:
+        return Path(outdir) / (Path(p).stem + '.pdf')
+    
+    cmd = shutil.which('soffice') or shutil.which('libreoffice')
+    if not cmd:
+        return {p: word_to_pdf(p, str(target(p))) for p in docx_paths}
+    
+    started = int(time.time())
+    
+    def convert(paths: List[str], profile: Optional[Path]) -> None:
+        args = [cmd]
+        if profile is not None:
+            args.append(f'-env:UserInstallation={profile.as_uri()}')
+        try:
+            subprocess.run([
+                *args,
+                '--headless',
+                '--convert-to', 'pdf',
+                '--outdir', outdir,
+                *paths
+            ], check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ LibreOffice conversion failed: {e}")
+    
+    workers = max(1, min(workers, len(docx_paths)))
+    shards = [docx_paths[i::workers] for i in range(workers)]
+    if len(shards) == 1:
+        convert(shards[0], None)
+    else:
+        # the profiles live in a private directory made for this run, so concurrent runs
+        # and other users can't share (or pre-create) them; the soffice processes do the
+        # work, threads just wait on them
+        with tempfile.TemporaryDirectory(prefix='pdf-tools-lo-') as tmp:
+            profiles = [Path(tmp) / f'profile-{i}' for i in range(len(shards))]
+            with ThreadPoolExecutor(max_workers=len(shards)) as ex:
+                list(ex.map(convert, shards, profiles))
+    
+    # soffice carries on past files it cannot convert (and word_to_pdf trusts its exit
+    # status), so judge each input by whether a fresh PDF appeared; an older one may be
+    # about to be overwritten
+    def fresh(p: str) -> bool:
+        try:
+            return target(p).stat().st_mtime >= started
+        except OSError:
+            return False
+    
+    results = {}
+    for p in docx_paths:
+        results[p] = fresh(p) or (word_to_pdf(p, str(target(p))) and fresh(p))
+    return results
+
+
 def extract_text_from_word(docx_path: str) -> str:
     """
     Extract text content from Word document.
@@ -385,12 +629,13 @@ def extract_text_from_word(docx_path: str) -> str:
     Returns:
         Extracted text (empty string on failure)
     """
-    if not PYTHON_DOCX_AVAILABLE:
+    docx = _optional('docx')
+    if docx is None:
         print("❌ python-docx not available (pip install python-docx)")
         return ""
     
     try:
-        doc = Document(docx_path)
+        doc = docx.Document(docx_path)
         text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
         return text
     except Exception as e:
@@ -482,6 +727,80 @@ def create_backup(path: Path, backup_dir: Optional[Path] = None) -> Path:
     return backup_path
 
 
+def stat_or_none(path: str) -> Optional[os.stat_result]:
+    """os.stat that returns None instead of raising (handy with executor.map)."""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def dir_names(parent: str, index: Dict[str, set], casefold: bool = False) -> set:
+    """
+    Names in a directory, listed once per directory via os.scandir.
+    
+    Args:
+        parent: Directory path ('' means the current directory)
+        index: Caller-owned cache of parent -> names, filled lazily; use
+            one index per casefold setting
+        casefold: Store casefolded names, for case-insensitive lookups
+            (APFS/HFS+ and NTFS treat names differing only in case as one)
+    
+    Returns:
+        Set of entry names (empty if the directory can't be read)
+    """
+    names = index.get(parent)
+    if names is None:
+        try:
+            with os.scandir(parent or ".") as it:
+                names = {e.name.casefold() for e in it} if casefold else {e.name for e in it}
+        except OSError:
+            names = set()
+        index[parent] = names
+    return names
+
+
+# ============================================================================
+# PLAN CSV HELPERS
+# ============================================================================
+
+# Columns of the renamer plan CSVs, in priority order; a row uses the first non-empty one
+PLAN_PATH_COLUMNS = ("proposed_path", "new_path", "proposed", "target_path")
+PLAN_AUTHOR_COLUMNS = ("proposed_author", "author")
+PLAN_TITLE_COLUMNS = ("proposed_title", "title")
+
+
+def column_positions(fieldnames: List[str], candidates) -> List[int]:
+    """Positions of the candidate columns present in a CSV header (last duplicate wins, like DictReader)."""
+    col = {name: i for i, name in enumerate(fieldnames)}
+    return [col[c] for c in candidates if c in col]
+
+
+def first_cell(row: List[str], cols: List[int]) -> str:
+    """First non-empty cell of a csv.reader row among the given positions ('' if none)."""
+    for i in cols:
+        if i < len(row) and row[i]:
+            return row[i]
+    return ""
+
+
+def print_samples(items: List[tuple], name: str, limit: int) -> None:
+    """
+    Print up to limit report items as CSV rows (kind, path, detail, actual).
+    
+    The block is built in memory and written with a single stdout write.
+    """
+    if not items:
+        return
+    buf = io.StringIO()
+    buf.write(f"\nSample {name} (up to {limit}):\n")
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(["kind", "path", "detail", "actual"])
+    for item in items[:limit]:
+        w.writerow([name, *(list(item) + ["", ""])[:3]])
+    sys.stdout.write(buf.getvalue())
+
+
 # ============================================================================
 # DEPENDENCY CHECK
 # ============================================================================
@@ -494,11 +813,12 @@ def check_dependencies() -> Dict[str, bool]:
         Dictionary of library availability
     """
     return {
-        'pymupdf': FITZ_AVAILABLE,
-        'pdfplumber': PDFPLUMBER_AVAILABLE,
-        'pypdf2': PYPDF2_AVAILABLE,
-        'reportlab': REPORTLAB_AVAILABLE,
-        'python-docx': PYTHON_DOCX_AVAILABLE,
+        'pymupdf': _optional('fitz') is not None,
+        'pikepdf': _optional('pikepdf') is not None,
+        'pdfplumber': _optional('pdfplumber') is not None,
+        'pypdf2': _optional('PyPDF2') is not None,
+        'reportlab': _optional('reportlab') is not None,
+        'python-docx': _optional('docx') is not None,
     }
 
 
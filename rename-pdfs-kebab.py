@@ -6,6 +6,7 @@
 import argparse
 import csv
 import datetime as dt
+import heapq
 import json
 import os
 import re
@@ -37,6 +38,14 @@ def to_kebab(text: str) -> str:
     return s.strip("-")
 
 
+# already-kebab strings (tag map keys, years, "et-al") come back from to_kebab unchanged
+_KEBAB_OK = re.compile(r"\A[a-z0-9]+(?:-[a-z0-9]+)*\Z")
+
+
+def _kebab_if_needed(s: str) -> str:
+    return s if _KEBAB_OK.match(s) else to_kebab(s)
+
+
 def surname_from_author(a: str) -> str:
     a = a.strip()
     if "," in a:  # "last, first"
@@ -116,7 +125,7 @@ def parse_pdf_metadata(doc: fitz.Document):
 
     authors_list = None
     if author:
-        parts = re.split(r"[;,]| and ", author, flags=re.IGNORECASE)
+        parts = _RE_AUTHOR_SEP.split(author)
         authors_list = [p.strip() for p in parts if p.strip()]
 
     return title, authors_list, year
@@ -132,7 +141,7 @@ def extract_first_pages(doc: fitz.Document, pages: int = 3) -> str:
     return "\n".join(chunks)
 
 
-def infer_from_first_page(doc: fitz.Document):
+def infer_from_first_page(doc: fitz.Document, text3: Optional[str] = None):
     # try structured spans first to find a plausible title
     try:
         page = doc[0]
@@ -149,18 +158,18 @@ def infer_from_first_page(doc: fitz.Document):
                     spans.append((span.get("size", 0.0), txt, span.get("origin", (0, 0))[1]))
 
     title = None
+    title_y = None
     if spans:
-        spans_sorted = sorted(spans, key=lambda x: x[0], reverse=True)
-        top_sizes = sorted({s for s, _, _ in spans_sorted[:60]}, reverse=True)[:3]
-        candidates = [(s, t, y) for (s, t, y) in spans if s in top_sizes and len(t) > 10]
-        candidates.sort(key=lambda x: (x[2], -len(x[1])))
-        title = candidates[0][1] if candidates else None
+        # three largest font sizes, then the highest (smallest y), longest span set in one of them
+        top_sizes = set(heapq.nlargest(3, {s for s, _, _ in spans}))
+        best = min(((y, -len(t), t) for (s, t, y) in spans if s in top_sizes and len(t) > 10), default=None)
+        if best:
+            title_y, _, title = best
 
     # authors: look lines near the title y with commas/initials
     authors = None
     joint_first = False
     if spans and title:
-        title_y = next(y for (s, t, y) in candidates if t == title)
         near = [t for (s, t, y) in spans if y > title_y and (y - title_y) < 220]
         for line in near:
             if looks_like_authors(line):
@@ -168,9 +177,10 @@ def infer_from_first_page(doc: fitz.Document):
                 break
 
     # year and joint-first phrases from first 3 pages
-    text3 = extract_first_pages(doc, pages=3)
+    if text3 is None:
+        text3 = extract_first_pages(doc, pages=3)
     year = pick_year_from_text(text3)
-    joint_first = bool(re.search(r"(contributed equally|co[-\s]?first author)", text3, re.IGNORECASE))
+    joint_first = has_joint_first(text3)
 
     # clean
     if title:
@@ -179,26 +189,30 @@ def infer_from_first_page(doc: fitz.Document):
     return title or None, authors, year, joint_first
 
 
+def has_joint_first(text: str) -> bool:
+    return bool(re.search(r"(contributed equally|co[-\s]?first author)", text, re.IGNORECASE))
+
+
 def looks_like_authors(line: str) -> bool:
     if len(line) > 200:
         return False
-    comma_count = line.count(",")
-    has_initials = bool(re.search(r"\b[A-Z]\.", line))
-    has_and = " and " in line.lower()
-    return (comma_count >= 1 or has_initials or has_and)
+    # C-level checks, cheapest first, short-circuiting on the first hit
+    return "," in line or bool(_RE_INITIAL.search(line)) or " and " in line.lower()
+
+
+_RE_INITIAL = re.compile(r"\b[A-Z]\.")
+_RE_AUTHOR_SEP = re.compile(r"[;,]| and ", re.IGNORECASE)
+_RE_AUTHOR_NOTES = re.compile(r"\(.*?\)|\[.*?\]|\<.*?\>")
 
 
 def split_authors(line: str) -> List[str]:
-    parts = re.split(r"[;,]| and ", line, flags=re.IGNORECASE)
-    out = []
-    for p in parts:
-        p = re.sub(r"\(.*?\)|\[.*?\]|\<.*?\>", "", p).strip()
-        if p:
-            out.append(p)
-    # dedupe
+    # dedupe (case-insensitive), keeping first spelling
     seen = set()
     keep = []
-    for a in out:
+    for p in _RE_AUTHOR_SEP.split(line):
+        a = _RE_AUTHOR_NOTES.sub("", p).strip()
+        if not a:
+            continue
         key = a.lower()
         if key not in seen:
             keep.append(a)
@@ -253,8 +267,15 @@ def fetch_crossref(doi: str) -> Tuple[Optional[str], Optional[List[str]], Option
 
 # ---------- filename assembly ----------
 
+# filename stem template per --style; build_filename adds the .pdf suffix
+FILENAME_FORMATS: Dict[str, str] = {
+    "author-year-title": "{author}-{year}-{title}",
+    "year-author-title": "{year}-{author}-{title}",
+}
+
+
 def build_filename(authors: Optional[List[str]], year: Optional[str], title: Optional[str],
-                   joint_first: bool, style: str) -> Optional[str]:
+                   joint_first: bool, fmt: str) -> Optional[str]:
     if not title:
         return None
 
@@ -273,12 +294,7 @@ def build_filename(authors: Optional[List[str]], year: Optional[str], title: Opt
     year_piece = year if year else "unknown-year"
     title_piece = to_kebab(title)
 
-    if style == "author-year-title":
-        base = f"{author_piece}-{year_piece}-{title_piece}"
-    elif style == "year-author-title":
-        base = f"{year_piece}-{author_piece}-{title_piece}"
-    else:
-        base = f"{author_piece}-{year_piece}-{title_piece}"
+    base = fmt.format_map({"author": author_piece, "year": year_piece, "title": title_piece})
 
     if len(base) > 180:
         base = base[:180].rstrip("-")
@@ -301,7 +317,7 @@ def update_metadata(doc: fitz.Document, title: Optional[str], authors: Optional[
 
     title_k = to_kebab(title) if title else None
     author_k = to_kebab("; ".join(authors)) if authors else None
-    kw_set = [to_kebab(t) for t in tags if t]
+    kw_set = [_kebab_if_needed(t) for t in tags if t]
     keywords_k = ", ".join(kw_set) if kw_set else None
 
     set_field("title", title_k)
@@ -327,7 +343,8 @@ def unique_path(target: Path) -> Path:
 
 # ---------- main processing ----------
 
-def process_pdf(path: Path, style: str, apply: bool, force_overwrite: bool) -> dict:
+def process_pdf(path: Path, fmt: str, apply: bool, force_overwrite: bool) -> dict:
+    # fmt is a FILENAME_FORMATS template, resolved once per run by main()
     res = {
         "old_path": str(path),
         "new_path": "",
@@ -337,30 +354,33 @@ def process_pdf(path: Path, style: str, apply: bool, force_overwrite: bool) -> d
         "doi": "",
         "tags": "",
         "status": "ok",
-        "error": "",
-        "format_used": style
+        "error": ""
     }
 
     try:
         with fitz.open(path) as doc:
-            # metadata
-            m_title, m_authors, m_year = parse_pdf_metadata(doc)
-
             # first pages text
             text3 = extract_first_pages(doc, pages=3)
 
-            # doi + crossref
+            # doi + crossref first: a full hit makes metadata and first-page inference redundant
             doi = find_doi(text3)
             res["doi"] = doi or ""
             c_title = c_authors = c_year = None
             if doi:
                 c_title, c_authors, c_year = fetch_crossref(doi)
 
-            # first-page inference
+            # metadata
+            m_title = m_authors = m_year = None
+            if not (c_title and c_authors and c_year):
+                m_title, m_authors, m_year = parse_pdf_metadata(doc)
+
+            # first-page inference, only while crossref + metadata is still incomplete
             f_title = f_authors = f_year = None
-            joint_first = False
-            if not (m_title and m_authors and m_year):
-                f_title, f_authors, f_year, joint_first = infer_from_first_page(doc)
+            if (c_title or m_title) and (c_authors or m_authors) and (c_year or m_year):
+                # same joint-first detection first-page inference would do unless metadata alone is complete
+                joint_first = has_joint_first(text3) if (c_authors or not (m_title and m_authors and m_year)) else False
+            else:
+                f_title, f_authors, f_year, joint_first = infer_from_first_page(doc, text3)
 
             # choose best
             title = c_title or m_title or f_title
@@ -376,7 +396,7 @@ def process_pdf(path: Path, style: str, apply: bool, force_overwrite: bool) -> d
             tags = []
             # base tags from authors/year/title for findability
             if authors:
-                tags.append(to_kebab(surname_from_author(authors[0])))
+                tags.append(_kebab_if_needed(surname_from_author(authors[0])))
                 if len(authors) > 1:
                     tags.append("et-al")
             if year:
@@ -386,7 +406,7 @@ def process_pdf(path: Path, style: str, apply: bool, force_overwrite: bool) -> d
             res["tags"] = ";".join(sorted(set(tags)))
 
             # filename
-            new_name = build_filename(authors, year, title, joint_first, style)
+            new_name = build_filename(authors, year, title, joint_first, fmt)
             if not new_name:
                 res["status"] = "skipped"
                 res["error"] = "could-not-build-filename"
@@ -432,13 +452,16 @@ def main():
     ts = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
     log_path = root / f"rename-log-{ts}.csv"
 
+    fmt = FILENAME_FORMATS.get(args.style, FILENAME_FORMATS["author-year-title"])
+
     rows = []
     count = 0
     for p in root.rglob("*"):
         # case-insensitive PDF detection (handles .PDF, .Pdf, etc.)
         if not p.is_file() or p.suffix.lower() != ".pdf":
             continue
-        res = process_pdf(p, style=args.style, apply=args.apply, force_overwrite=args.force_overwrite_metadata)
+        res = process_pdf(p, fmt=fmt, apply=args.apply, force_overwrite=args.force_overwrite_metadata)
+        res["format_used"] = args.style
         rows.append(res)
         count += 1
         if count % 25 == 0:
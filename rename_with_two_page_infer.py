@@ -6,13 +6,14 @@ Lightweight renamer that builds on your existing policy but enforces:
 - Dry-run by default; writes a CSV plan and supports --apply to perform renames + atomic metadata writes.
 
 Usage:
-  python rename_with_two_page_infer.py /path/to/corpus --csv out.csv [--apply]
+  python rename_with_two_page_infer.py /path/to/corpus --csv out.csv [--apply] [--preserve-mtime]
 
 This script is intentionally conservative: it prefers existing PDF metadata (Author/Title) if present,
 otherwise it scans up to page 2 for likely title/author lines.
 """
 import argparse
 import csv
+import hashlib
 import os
 import re
 import tempfile
@@ -31,6 +32,8 @@ CSV_HEADERS = [
 ]
 
 YEAR_RE = re.compile(r"(19|20)\d{2}")
+_RE_AUTHORLIKE = re.compile(r"[A-Za-z] ")
+_RE_AUTHOR_EXCLUDE = re.compile(r"abstract|introduction|keywords|doi|©|copyright", re.I)
 
 
 def kebab(s: str, max_len=200):
@@ -50,7 +53,6 @@ def safe_target_filename(prefix: str, lastname: str, firstname: str, year: str,
     (without directory) doesn't exceed max_total characters. Appends an 8-char hash when
     truncation occurs to avoid collisions.
     """
-    import hashlib
     # base pattern: {prefix}{initial}-{year}-{kebab(title)}.pdf
     initial = (firstname[0].upper() if firstname else 'X')
     base_name = f"{prefix}{initial}-{year}-"
@@ -105,16 +107,22 @@ def read_text_from_pdf(path, max_pages=2):
         doc = fitz.open(path)
     except Exception:
         return ''
+    try:
+        return _read_text_from_open_doc(doc, max_pages=max_pages)
+    finally:
+        try:
+            doc.close()
+        except Exception:
+            pass
+
+
+def _read_text_from_open_doc(doc, max_pages=2):
     txt = []
     for p in range(min(max_pages, doc.page_count)):
         try:
             txt.append(doc[p].get_text('text'))
         except Exception:
             pass
-    try:
-        doc.close()
-    except Exception:
-        pass
     return '\n'.join(txt)
 
 
@@ -128,9 +136,9 @@ def infer_from_text(text):
         title = lines[0]
     # Try to find a line that looks like an author (contains a space and letters)
     for ln in lines[1:6]:
-        if re.search(r"[A-Za-z] ", ln):
+        if _RE_AUTHORLIKE.search(ln):
             # avoid lines with 'abstract' or 'introduction'
-            if re.search(r"abstract|introduction|keywords|doi|©|copyright", ln, re.I):
+            if _RE_AUTHOR_EXCLUDE.search(ln):
                 continue
             author = ln
             break
@@ -141,6 +149,11 @@ def infer_from_text(text):
     return (author, title, year)
 
 
+def _infer_from_open_doc(doc, max_pages=2):
+    """Same as infer_from_text(read_text_from_pdf(...)) but reuses an already open document."""
+    return infer_from_text(_read_text_from_open_doc(doc, max_pages=max_pages))
+
+
 def build_target_filename(lastname, firstname, year, title):
     if not lastname:
         lastname = 'unknown'
@@ -151,12 +164,21 @@ def build_target_filename(lastname, firstname, year, title):
     return safe_target_filename(prefix, lastname, firstname, y, title, max_total=220)
 
 
-def atomic_write_metadata(path, title, author):
-    # write metadata into a temp file then move over
-    try:
-        doc = fitz.open(path)
-    except Exception as e:
-        return False, str(e)
+def _needs_full_save(exc):
+    """True when saveIncr failed because the file can't take an incremental update
+    (repaired/damaged xref, encryption change) rather than for some unrelated error."""
+    if isinstance(exc, fitz.FileDataError):
+        return True
+    return 'incremental' in str(exc).lower()
+
+
+def _save_metadata(doc, path, title, author):
+    """Set title/author on an already open doc and persist them.
+
+    Returns (ok, msg, tmppath). When the incremental save is not possible the doc is written to
+    tmppath (next to path, so the later os.replace stays on one filesystem) and the caller must
+    move it over path once the doc has been closed.
+    """
     md = doc.metadata
     if title:
         md['title'] = title
@@ -166,127 +188,191 @@ def atomic_write_metadata(path, title, author):
     # Attempt incremental save first
     try:
         doc.saveIncr()
-        doc.close()
-        return True, 'incr'
-    except Exception:
-        pass
-    # fallback save to temp and replace
+        return True, 'incr', None
+    except Exception as e:
+        if not _needs_full_save(e):
+            return False, str(e), None
+    # full (compacting) save to a temp file, replaced by the caller after close
+    tmppath = None
     try:
-        tmpfd, tmppath = tempfile.mkstemp(suffix='.pdf', prefix='tmp-renamer-')
+        tmpfd, tmppath = tempfile.mkstemp(suffix='.pdf', prefix='.tmp-renamer-',
+                                          dir=os.path.dirname(os.path.abspath(path)))
         os.close(tmpfd)
-        doc.save(tmppath)
-        doc.close()
-        shutil.copystat(path, tmppath)
+        doc.save(tmppath, garbage=4, deflate=True, clean=True)
+        return True, 'atomic', tmppath
+    except Exception as e:
+        if tmppath and os.path.exists(tmppath):
+            os.unlink(tmppath)
+        return False, str(e), None
+
+
+def _replace_from_tmp(tmppath, path, preserve_mtime=False):
+    try:
+        # the full save recreates tmppath with umask permissions; keep the original file's mode
+        shutil.copymode(path, tmppath)
+        if preserve_mtime:
+            shutil.copystat(path, tmppath)
         os.replace(tmppath, path)
         return True, 'atomic'
     except Exception as e:
-        try:
-            doc.close()
-        except Exception:
-            pass
         return False, str(e)
 
 
-def process_folder(folder, out_csv, apply=False):
-    rows = []
-    for entry in sorted(os.listdir(folder)):
-        if not entry.lower().endswith('.pdf'):
-            continue
-        full = os.path.join(folder, entry)
-        # read existing metadata
+def atomic_write_metadata(path, title, author, preserve_mtime=False):
+    # write metadata in place; only rewrites the whole file when an incremental save is refused
+    try:
+        doc = fitz.open(path)
+    except Exception as e:
+        return False, str(e)
+    try:
+        ok, msg, tmppath = _save_metadata(doc, path, title, author)
+    finally:
         try:
-            doc = fitz.open(full)
-            md = doc.metadata
             doc.close()
         except Exception:
-            md = {}
-        meta_author = md.get('author', '') if isinstance(md.get('author', ''), str) else ''
-        meta_title = md.get('title', '') if isinstance(md.get('title', ''), str) else ''
-        year = None
-        # try year from metadata
-        if md.get('modDate'):
-            m = YEAR_RE.search(md.get('modDate'))
-            if m:
-                year = m.group(0)
-        # fallback year from filename
-        ymatch = YEAR_RE.search(entry)
-        if ymatch and not year:
-            year = ymatch.group(0)
-        # prefer metadata; otherwise inspect first two pages
-        author_guess = meta_author
-        title_guess = meta_title
-        reason = ''
-        if not meta_author or not meta_title:
-            txt = read_text_from_pdf(full, max_pages=2)
-            a2, t2, y2 = infer_from_text(txt)
-            if a2 and (not meta_author):
-                author_guess = a2
-                reason += 'inferred_author;'
-            if t2 and (not meta_title):
-                title_guess = t2
-                reason += 'inferred_title;'
-            if y2 and not year:
-                year = y2
-        # normalize author to Lastname, Firstname
-        lastname, firstname, human = normalize_author_str(author_guess)
-        # if normalization produced empty firstname but author_guess like 'matthewK' try split camel-case
-        if not firstname and lastname:
-            # try to split lowercase name + CapitalInitial e.g., matthewK
-            m = re.match(r"^([a-z]+)([A-Z])$", lastname)
-            if m:
-                firstname = m.group(1)
-                lastname = m.group(2)
-                human = f"{lastname}, {firstname}"
-        # Build target
-        proposed_filename = build_target_filename(lastname, firstname, year, title_guess or entry)
-        proposed_path = os.path.join(folder, proposed_filename)
-        # ensure uniqueness
-        base, ext = os.path.splitext(proposed_path)
-        i = 1
-        while os.path.exists(proposed_path) and os.path.realpath(proposed_path) != os.path.realpath(full):
-            proposed_path = f"{base}-{i}{ext}"
-            i += 1
-        if os.path.realpath(full) == os.path.realpath(proposed_path):
-            reason = reason or 'noop'
+            pass
+    if tmppath:
+        return _replace_from_tmp(tmppath, path, preserve_mtime=preserve_mtime)
+    return ok, msg
+
+
+def _plan_entry(folder, entry, full, md, doc, taken):
+    """Build the CSV row for one PDF; doc is the open document (or None if it failed to open).
+
+    taken holds the names already spoken for in this run (the folder listing taken at the start plus
+    every name proposed so far); the chosen name is added to it.
+    """
+    meta_author = md.get('author', '') if isinstance(md.get('author', ''), str) else ''
+    meta_title = md.get('title', '') if isinstance(md.get('title', ''), str) else ''
+    year = None
+    # try year from metadata
+    if md.get('modDate'):
+        m = YEAR_RE.search(md.get('modDate'))
+        if m:
+            year = m.group(0)
+    # fallback year from filename
+    ymatch = YEAR_RE.search(entry)
+    if ymatch and not year:
+        year = ymatch.group(0)
+    # prefer metadata; otherwise inspect first two pages
+    author_guess = meta_author
+    title_guess = meta_title
+    reason = ''
+    if not meta_author or not meta_title:
+        if doc is not None:
+            a2, t2, y2 = _infer_from_open_doc(doc, max_pages=2)
         else:
-            reason = reason or 'rename'
-        rows.append({
-            'original_path': full,
-            'proposed_path': proposed_path,
-            'original_filename': entry,
-            'proposed_filename': os.path.basename(proposed_path),
-            'meta_author': human,
-            'meta_title': title_guess,
-            'reason': reason,
-        })
-    # write CSV
+            a2, t2, y2 = infer_from_text('')
+        if a2 and (not meta_author):
+            author_guess = a2
+            reason += 'inferred_author;'
+        if t2 and (not meta_title):
+            title_guess = t2
+            reason += 'inferred_title;'
+        if y2 and not year:
+            year = y2
+    # normalize author to Lastname, Firstname
+    lastname, firstname, human = normalize_author_str(author_guess)
+    # if normalization produced empty firstname but author_guess like 'matthewK' try split camel-case
+    if not firstname and lastname:
+        # try to split lowercase name + CapitalInitial e.g., matthewK
+        m = re.match(r"^([a-z]+)([A-Z])$", lastname)
+        if m:
+            firstname = m.group(1)
+            lastname = m.group(2)
+            human = f"{lastname}, {firstname}"
+    # Build target
+    proposed_filename = build_target_filename(lastname, firstname, year, title_guess or entry)
+    proposed_path = os.path.join(folder, proposed_filename)
+    # ensure uniqueness; checking taken rather than only the disk keeps the plan the same whether or
+    # not earlier files have already been renamed (--apply) or not (dry-run)
+    base, ext = os.path.splitext(proposed_path)
+    i = 1
+    while ((os.path.basename(proposed_path) in taken or os.path.exists(proposed_path))
+           and os.path.realpath(proposed_path) != os.path.realpath(full)):
+        proposed_path = f"{base}-{i}{ext}"
+        i += 1
+    taken.add(os.path.basename(proposed_path))
+    if os.path.realpath(full) == os.path.realpath(proposed_path):
+        reason = reason or 'noop'
+    else:
+        reason = reason or 'rename'
+    return {
+        'original_path': full,
+        'proposed_path': proposed_path,
+        'original_filename': entry,
+        'proposed_filename': os.path.basename(proposed_path),
+        'meta_author': human,
+        'meta_title': title_guess,
+        'reason': reason,
+    }
+
+
+def process_folder(folder, out_csv, apply=False, preserve_mtime=False):
+    rows = []
+    # the CSV is the undo log: each row is written and flushed before that file is touched,
+    # so an interrupted --apply still leaves a record of everything already renamed
     with open(out_csv, 'w', newline='', encoding='utf-8') as f:
         w = csv.DictWriter(f, fieldnames=CSV_HEADERS)
         w.writeheader()
-        for r in rows:
+        f.flush()
+
+        def log(r):
+            rows.append(r)
             w.writerow(r)
-    # if apply, perform renames and metadata writes
-    if apply:
-        for r in rows:
-            if r['reason'] == 'noop':
+            f.flush()
+
+        entries = sorted(os.listdir(folder))
+        taken = set(entries)
+        for entry in entries:
+            if not entry.lower().endswith('.pdf'):
+                continue
+            full = os.path.join(folder, entry)
+            # open once: metadata, text inference and (with --apply) the metadata write share one parse
+            try:
+                doc = fitz.open(full)
+            except Exception:
+                doc = None
+            write = None
+            if doc is None:
+                r = _plan_entry(folder, entry, full, {}, None, taken)
+                log(r)
+            else:
+                with doc:
+                    try:
+                        md = doc.metadata or {}
+                    except Exception:
+                        md = {}
+                    r = _plan_entry(folder, entry, full, md, doc, taken)
+                    log(r)
+                    src = r['original_path']
+                    dst = r['proposed_path']
+                    if apply and r['reason'] != 'noop' and not (
+                            os.path.exists(dst) and os.path.realpath(dst) != os.path.realpath(src)):
+                        # write metadata author/title before the rename
+                        write = _save_metadata(doc, full, r.get('meta_title'), r.get('meta_author'))
+            if not apply or r['reason'] == 'noop':
                 continue
             src = r['original_path']
             dst = r['proposed_path']
             if os.path.exists(dst) and os.path.realpath(dst) != os.path.realpath(src):
                 print(f"SKIP - target exists: {dst}")
                 continue
+            ok, msg = (False, 'unreadable pdf')
+            if write is not None:
+                ok, msg, tmppath = write
+                if tmppath:
+                    ok, msg = _replace_from_tmp(tmppath, src, preserve_mtime=preserve_mtime)
             try:
                 os.rename(src, dst)
                 print(f"APPLY {src} -> {dst}")
             except Exception as e:
                 print(f"FAIL rename {src} -> {dst}: {e}")
-            # write metadata author/title
-            ok, msg = atomic_write_metadata(dst, r.get('meta_title'), r.get('meta_author'))
             if ok:
                 print(f"OK {dst}")
             else:
                 print(f"WARN metadata {dst}: {msg}")
-    else:
+    if not apply:
         # summary
         planned = [r for r in rows if r['reason'] != 'noop']
         print(f"Planned items: {len(planned)}. CSV: {out_csv}")
@@ -297,9 +383,11 @@ if __name__ == '__main__':
     p.add_argument('folder')
     p.add_argument('--csv', default=None)
     p.add_argument('--apply', action='store_true')
+    p.add_argument('--preserve-mtime', action='store_true',
+                   help='keep the original timestamps when a file has to be fully rewritten')
     args = p.parse_args()
     folder = args.folder
     if not args.csv:
         ts = datetime.now().strftime('%Y%m%d-%H%M%S')
         args.csv = os.path.join(folder, f'metadata-rename-plan-{ts}.csv')
-    process_folder(folder, args.csv, apply=args.apply)
+    process_folder(folder, args.csv, apply=args.apply, preserve_mtime=args.preserve_mtime)
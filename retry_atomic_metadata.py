@@ -12,14 +12,23 @@ Usage:
 This script does not rename files; it only (re)writes metadata for the "proposed" files
 listed in the CSV. It runs in dry-run mode by default; pass --apply to actually write.
 
+Atomic writes are read back (SHA-256 + PDF sanity check) before replacing the original, and
+each completed write is appended to <dir>/.resilient_write/journal.jsonl.
+
 It depends on PyMuPDF (fitz).
 """
 import argparse
 import csv
+import hashlib
+import itertools
+import json
 import os
+import shutil
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, Optional, Tuple
 
 try:
     import fitz
@@ -27,6 +36,79 @@ except Exception as e:
     fitz = None
 
 
+_TMP_COUNTER = itertools.count()
+
+
+def _create_temp_beside(path: Path) -> Path:
+    """Exclusively create an empty temp file next to `path` (same filesystem, so os.replace is atomic).
+
+    The name is unique per process + call, so a single O_CREAT|O_EXCL open normally suffices;
+    if it's somehow taken we fall back to tempfile.mkstemp.
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{next(_TMP_COUNTER)}.tmp")
+    try:
+        fd = os.open(str(tmp_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+        tmp_path = Path(tmp_name)
+    os.close(fd)
+    return tmp_path
+
+
+JOURNAL_DIR = ".resilient_write"
+
+
+class WriteCorruption(RuntimeError):
+    """The freshly written temp PDF failed read-back verification."""
+
+
+def _verify_written_pdf(tmp_path: Path) -> Tuple[str, int]:
+    """Stream the file through SHA-256, fsync it, and check it is a PDF MuPDF can open.
+
+    Returns (sha256 hexdigest, size in bytes); raises WriteCorruption otherwise.
+    """
+    h = hashlib.sha256()
+    size = 0
+    with open(tmp_path, "rb") as f:
+        head = f.read(5)
+        if head != b"%PDF-":
+            raise WriteCorruption(f"{tmp_path}: missing %PDF- header")
+        h.update(head)
+        size += len(head)
+        while buf := f.read(1 << 20):
+            h.update(buf)
+            size += len(buf)
+        os.fsync(f.fileno())
+    try:
+        with fitz.open(str(tmp_path)) as check:
+            if check.page_count < 1:
+                raise WriteCorruption(f"{tmp_path}: no pages after write")
+    except WriteCorruption:
+        raise
+    except Exception as e:
+        raise WriteCorruption(f"{tmp_path}: unreadable after write: {e}") from e
+    return h.hexdigest(), size
+
+
+def _journal_write(path: Path, digest: str, size: int) -> None:
+    """Append one JSON line for a completed write to <dir>/.resilient_write/journal.jsonl (best effort)."""
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "path": str(path),
+        "sha256": digest,
+        "bytes": size,
+        "mode": "atomic",
+    }
+    try:
+        jdir = path.parent / JOURNAL_DIR
+        jdir.mkdir(exist_ok=True)
+        # single write of a whole line: appends from parallel workers don't interleave
+        with open(jdir / "journal.jsonl", "ab") as jf:
+            jf.write((json.dumps(entry) + "\n").encode("utf-8"))
+    except OSError:
+        pass
+
+
 def write_pdf_metadata(path: Path, title: Optional[str] = None, author: Optional[str] = None,
                        keywords: Optional[str] = None, atomic: bool = True) -> bool:
     """
@@ -63,21 +145,22 @@ def write_pdf_metadata(path: Path, title: Optional[str] = None, author: Optional
                 pass
 
         # atomic path: save to temp file in same dir then replace
-        dirpath = path.parent
-        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(dirpath))
-        os.close(fd)
-        tmp_path = Path(tmp_name)
-        doc.save(str(tmp_path))
+        tmp_path = _create_temp_beside(path)
+        # only the Info dict changed: recompressing/garbage-collecting streams gains nothing
+        doc.save(str(tmp_path), garbage=0, deflate=False)
         doc.close()
         doc = None
+        # read back: hash + sanity-check the temp file and make sure it's on disk before it
+        # replaces the original; a truncated write (e.g. disk full) must not clobber a good PDF
+        digest, size = _verify_written_pdf(tmp_path)
         # Ensure permissions/stat are preserved if desired
         try:
-            import shutil
             shutil.copystat(str(path), str(tmp_path))
         except Exception:
             pass
         os.replace(str(tmp_path), str(path))
         tmp_path = None
+        _journal_write(path, digest, size)
         return True
     except Exception as e:
         # Caller may log details
@@ -95,9 +178,22 @@ def write_pdf_metadata(path: Path, title: Optional[str] = None, author: Optional
                 pass
 
 
-def find_failure_column(fieldnames):
+def _write_one(task: Tuple[Path, Optional[str], Optional[str], Optional[str], bool]) -> Tuple[bool, Path]:
+    """Process-pool entry point: task is (path, title, author, keywords, atomic)."""
+    path, title, author, keywords, atomic = task
+    return write_pdf_metadata(path, title=title, author=author, keywords=keywords, atomic=atomic), path
+
+
+def _index_headers(fieldnames) -> Dict[str, str]:
+    """Map lowercased header -> original header (first occurrence wins); built once per CSV."""
+    idx: Dict[str, str] = {}
+    for c in fieldnames:
+        idx.setdefault(c.lower(), c)
+    return idx
+
+
+def find_failure_column(idx):
     """Try common column names indicating metadata write success/failure."""
-    lower = [c.lower() for c in fieldnames]
     candidates = [
         "metadata_success",
         "metadata_written",
@@ -109,43 +205,64 @@ def find_failure_column(fieldnames):
         "write_metadata_ok",
     ]
     for cand in candidates:
-        if cand in lower:
-            return fieldnames[lower.index(cand)]
-    for name in fieldnames:
-        if "meta" in name.lower() and "success" in name.lower():
+        if cand in idx:
+            return idx[cand]
+    for low, name in idx.items():
+        if "meta" in low and "success" in low:
             return name
     return None
 
 
-def find_proposed_path_col(fieldnames):
-    lower = [c.lower() for c in fieldnames]
+def find_proposed_path_col(idx):
     for cand in ("proposed_path", "new_path", "proposed", "proposed_filepath", "target_path"):
-        if cand in lower:
-            return fieldnames[lower.index(cand)]
+        if cand in idx:
+            return idx[cand]
     return None
 
 
-def find_proposed_author_col(fieldnames):
-    lower = [c.lower() for c in fieldnames]
+def find_proposed_author_col(idx):
     for cand in ("proposed_author", "author", "proposed_author_name"):
-        if cand in lower:
-            return fieldnames[lower.index(cand)]
+        if cand in idx:
+            return idx[cand]
     return None
 
 
-def find_proposed_title_col(fieldnames):
-    lower = [c.lower() for c in fieldnames]
+def find_proposed_title_col(idx):
     for cand in ("proposed_title", "title"):
-        if cand in lower:
-            return fieldnames[lower.index(cand)]
+        if cand in idx:
+            return idx[cand]
     return None
 
 
+def iter_candidates(rdr, prop_i: int, author_i: Optional[int], title_i: Optional[int],
+                    fail_i: Optional[int]) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Stream (proposed_path, author, title) for rows whose metadata write needs (re)doing.
+
+    rdr is a csv.reader positioned after the header; column positions are resolved once by the caller.
+    """
+    def cell(row, i):
+        return row[i] if i is not None and i < len(row) else None
+
+    for row in rdr:
+        if not row:
+            continue  # blank line; DictReader used to skip these
+        # treat missing/blank as failure
+        meta_ok = True
+        if fail_i is not None:
+            val = (cell(row, fail_i) or "").strip().lower()
+            if val in ("false", "0", "no", "n", ""):
+                meta_ok = False
+        # If no fail column, we'll attempt to rewrite metadata for all rows
+        if not meta_ok or fail_i is None:
+            yield cell(row, prop_i), cell(row, author_i), cell(row, title_i)
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("csv", type=str, help="Path to metadata-rename CSV produced by renamer")
     p.add_argument("--apply", action="store_true", help="Actually write metadata; default is dry-run")
     p.add_argument("--atomic", action="store_true", default=True, help="Force atomic temp-file write (default: True)")
+    p.add_argument("--workers", type=int, default=None, help="Parallel writer processes (default: CPU count)")
     args = p.parse_args()
 
     csv_path = Path(args.csv)
@@ -153,46 +270,43 @@ def main():
         print("CSV not found:", csv_path)
         raise SystemExit(2)
 
-    rows = []
     with csv_path.open("r", newline="") as f:
-        rdr = csv.DictReader(f)
-        fieldnames = rdr.fieldnames or []
-        fail_col = find_failure_column(fieldnames)
-        prop_col = find_proposed_path_col(fieldnames)
-        author_col = find_proposed_author_col(fieldnames)
-        title_col = find_proposed_title_col(fieldnames)
+        rdr = csv.reader(f)
+        fieldnames = next(rdr, [])
+        headers = _index_headers(fieldnames)
+        fail_col = find_failure_column(headers)
+        prop_col = find_proposed_path_col(headers)
+        author_col = find_proposed_author_col(headers)
+        title_col = find_proposed_title_col(headers)
 
         if prop_col is None:
             print("Could not detect proposed_path/new_path column. CSV header:", fieldnames)
             raise SystemExit(2)
 
-        for r in rdr:
-            # treat missing/blank as failure
-            meta_ok = True
-            if fail_col:
-                val = (r.get(fail_col) or "").strip().lower()
-                if val in ("false", "0", "no", "n", ""):
-                    meta_ok = False
-            # If no fail_col, we'll attempt to rewrite metadata for all rows
-            if not meta_ok or fail_col is None:
-                rows.append(r)
-
-    print(f"Found {len(rows)} candidate rows to (re)write metadata")
-    if not rows:
-        return
-
-    for r in rows:
-        proposed = Path(r.get(prop_col) or "")
-        if not proposed.exists():
-            print("Skipping missing file:", proposed)
-            continue
-        author = r.get(author_col) if author_col else None
-        title = r.get(title_col) if title_col else None
-        print(("DRY-RUN" if not args.apply else "APPLY"), proposed, f"author={author!r}", f"title={title!r}")
-        if args.apply:
-            ok = write_pdf_metadata(proposed, title=title, author=author, atomic=args.atomic)
-            print(("OK" if ok else "FAIL"), proposed)
+        col = {name: i for i, name in reversed(list(enumerate(fieldnames)))}
+        candidates = iter_candidates(rdr, col[prop_col],
+                                     col[author_col] if author_col else None,
+                                     col[title_col] if title_col else None,
+                                     col[fail_col] if fail_col else None)
+
+        found = 0
+        tasks = []
+        for proposed_s, author, title in candidates:
+            found += 1
+            proposed = Path(proposed_s or "")
+            if not proposed.exists():
+                print("Skipping missing file:", proposed)
+                continue
+            print(("DRY-RUN" if not args.apply else "APPLY"), proposed, f"author={author!r}", f"title={title!r}")
+            tasks.append((proposed, title, author, None, args.atomic))
+
+    print(f"Found {found} candidate rows to (re)write metadata")
 
+    if args.apply and tasks:
+        # each write is a full libmupdf save, so spread them over processes
+        with ProcessPoolExecutor(max_workers=args.workers) as ex:
+            for ok, path in ex.map(_write_one, tasks, chunksize=8):
+                print(("OK" if ok else "FAIL"), path)
 
 if __name__ == "__main__":
     main()
@@ -17,8 +17,11 @@ from __future__ import annotations
 import argparse
 import csv
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from pdf_utils import save_in_place
+
 try:
     import fitz
 except Exception:
@@ -26,13 +29,19 @@ except Exception:
     raise
 
 
+PLAN_COLUMNS = ('action', 'original_path', 'proposed_path', 'original_title', 'original_author', 'original_keywords')
+
+
 def read_plan(csvpath: Path):
-    rows = []
-    with csvpath.open('r', encoding='utf-8') as fh:
-        r = csv.DictReader(fh)
+    """Stream (action, orig, prop, otitle, oauthor, okeywords) tuples from the plan CSV."""
+    with csvpath.open('r', encoding='utf-8', newline='') as fh:
+        r = csv.reader(fh)
+        header = next(r, [])
+        idx = [header.index(c) if c in header else None for c in PLAN_COLUMNS]
         for row in r:
-            rows.append(row)
-    return rows
+            if not row:
+                continue
+            yield tuple((row[i] if i is not None and i < len(row) else '') for i in idx)
 
 
 def restore_metadata(path: Path, title: str, author: str, keywords: str):
@@ -43,17 +52,27 @@ def restore_metadata(path: Path, title: str, author: str, keywords: str):
         meta['author'] = author or ''
         meta['keywords'] = keywords or ''
         doc.set_metadata(meta)
-        doc.save(path, garbage=4, deflate=True)
-        doc.close()
+        try:
+            save_in_place(doc, path)
+        finally:
+            doc.close()
         return True, None
     except Exception as e:
         return False, str(e)
 
 
+def _restore_one(task):
+    """Process-pool entry point: task is (path, title, author, keywords)."""
+    path = task[0]
+    ok, err = restore_metadata(*task)
+    return path, ok, err
+
+
 def main(argv=None):
     p = argparse.ArgumentParser()
     p.add_argument('plan_csv', help='CSV plan produced by update_pdf_metadata_and_rename.py')
     p.add_argument('--apply', action='store_true', help='Perform revert operations')
+    p.add_argument('--workers', type=int, default=None, help='Parallel metadata-restore processes (default: CPU count)')
     args = p.parse_args(argv)
 
     csvpath = Path(args.plan_csv)
@@ -61,15 +80,15 @@ def main(argv=None):
         print(f"Plan {csvpath} not found", file=sys.stderr)
         return 2
 
-    rows = read_plan(csvpath)
-    print(f"Plan rows: {len(rows)}")
+    total = 0
     failures = []
-    for r in rows:
-        action = r.get('action','')
+    restores = []
+    for action, orig_s, prop_s, otitle, oauthor, okeywords in read_plan(csvpath):
+        total += 1
         if action != 'rename':
             continue
-        orig = Path(r['original_path'])
-        prop = Path(r['proposed_path'])
+        orig = Path(orig_s)
+        prop = Path(prop_s)
         if args.apply:
             # If original already exists, create a unique backup of original
             if not prop.exists():
@@ -87,16 +106,21 @@ def main(argv=None):
                 print(f"Failed to rename {prop} -> {orig}: {e}")
                 failures.append((prop, str(e)))
                 continue
-            # restore metadata if provided in the CSV original fields (original_title/original_author/original_keywords)
-            ok, err = restore_metadata(orig, r.get('original_title','') or '', r.get('original_author','') or '', r.get('original_keywords','') or '')
-            if not ok:
-                print(f"Warning: failed to restore metadata for {orig}: {err}")
-                failures.append((orig, err))
+            # restore metadata from the CSV original fields (original_title/original_author/original_keywords)
+            # after all renames; the saves are independent so they run in parallel below
+            restores.append((orig, otitle, oauthor, okeywords))
         else:
             # dry-run: just report what would be done
             print(f"Would rename: {prop} -> {orig}")
             if not prop.exists():
                 print(f"  Note: proposed file does not exist (ok if not applied yet): {prop}")
+    print(f"Plan rows: {total}")
+    if restores:
+        with ProcessPoolExecutor(max_workers=args.workers) as ex:
+            for orig, ok, err in ex.map(_restore_one, restores, chunksize=16):
+                if not ok:
+                    print(f"Warning: failed to restore metadata for {orig}: {err}")
+                    failures.append((orig, err))
     print(f"Done. failures: {len(failures)}")
     return 0
 
@@ -10,14 +10,14 @@ Usage:
   run_all.py list-scripts
 
 This wrapper calls the `batch_rename_workflow.py` and `inspect_pdf_metadata.py`
-scripts that live alongside it. It uses the same Python interpreter used to run
-this script to invoke them (so virtualenvs are respected).
+scripts that live alongside it. They are imported and their `main(argv)` is
+called in-process, so fitz and friends are only imported once per run.
 
 This file intentionally keeps CLI plumbing minimal and delegates the work to
 the existing scripts (safe, auditable, and already tested during earlier runs).
 """
 import argparse
-import subprocess
+import importlib
 import sys
 import shutil
 from pathlib import Path
@@ -27,20 +27,37 @@ ROOT = Path(__file__).resolve().parent
 BATCH = ROOT / 'batch_rename_workflow.py'
 INSPECT = ROOT / 'inspect_pdf_metadata.py'
 
+# Import sibling scripts as modules
+sys.path.insert(0, str(ROOT))
+
 
 def check_script(p: Path):
     if not p.exists():
         raise SystemExit(f'Required script not found: {p}')
 
 
+def run_script(p: Path, argv):
+    """Import the script next to this file and call its main(argv) in-process.
+
+    A sys.exit() inside the script is caught; a non-zero exit status stops the
+    orchestrator the same way a failed subprocess (check=True) used to.
+    """
+    check_script(p)
+    print('Running:', p.name, ' '.join(argv))
+    module = importlib.import_module(p.stem)
+    try:
+        rc = module.main(argv)
+    except SystemExit as e:
+        rc = e.code
+    if rc not in (None, 0):
+        raise SystemExit(f'{p.name} failed with exit status {rc}')
+
+
 def run_batch(args, extra_args=None):
-    check_script(BATCH)
-    cmd = [sys.executable, str(BATCH)]
-    cmd += ['--src', args.src, '--out', args.out, '--backup', args.backup, '--logs', args.logs]
+    argv = ['--src', args.src, '--out', args.out, '--backup', args.backup, '--logs', args.logs]
     if extra_args:
-        cmd += extra_args
-    print('Running:', ' '.join(cmd))
-    subprocess.run(cmd, check=True)
+        argv += extra_args
+    run_script(BATCH, argv)
 
 
 def cmd_propose(args):
@@ -60,10 +77,7 @@ def cmd_apply(args):
 
 
 def cmd_inspect(argv):
-    check_script(INSPECT)
-    cmd = [sys.executable, str(INSPECT)] + argv
-    print('Running:', ' '.join(cmd))
-    subprocess.run(cmd, check=True)
+    run_script(INSPECT, argv)
 
 
 def cmd_list_scripts():
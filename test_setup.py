@@ -4,6 +4,7 @@ Test script to verify letterhead overlay setup
 Checks that all required files exist and displays current configuration
 """
 
+import os
 from pathlib import Path
 from reportlab.lib.units import cm
 import sys
@@ -15,10 +16,11 @@ print("🔍 PDF Letterhead Setup Verification")
 print("=" * 60)
 
 # Check paths
-LETTERHEAD_PDF = Path.home() / "Documents/clinic/templates-clinic/template-letterhead/template-letterhead-2.pdf"
-SIGNATURE_PNG = Path.home() / "Documents/clinic/templates-clinic/template-signature/template-signature-white-master-v1.png"
-DOWNLOADS_DIR = Path.home() / "Downloads"
-OUTPUT_DIR = Path.home() / "Documents/clinic/letters-referrals"
+HOME = Path.home()
+LETTERHEAD_PDF = HOME / "Documents/clinic/templates-clinic/template-letterhead/template-letterhead-2.pdf"
+SIGNATURE_PNG = HOME / "Documents/clinic/templates-clinic/template-signature/template-signature-white-master-v1.png"
+DOWNLOADS_DIR = HOME / "Downloads"
+OUTPUT_DIR = HOME / "Documents/clinic/letters-referrals"
 
 checks = []
 
@@ -39,7 +41,8 @@ else:
 
 # Downloads directory
 if DOWNLOADS_DIR.exists():
-    pdf_count = len(list(DOWNLOADS_DIR.glob("*.pdf")))
+    pdf_count = sum(1 for e in os.scandir(DOWNLOADS_DIR)
+                    if not e.is_dir(follow_symlinks=False) and e.name.lower().endswith('.pdf'))
     checks.append(f"✅ Downloads folder: {pdf_count} PDF(s) found")
 else:
     checks.append(f"❌ Downloads folder NOT FOUND: {DOWNLOADS_DIR}")
@@ -7,6 +7,7 @@ Behavior:
 - Computes a target filename using the pattern: [firstname][firstletterofsurname]-[yyyy]-[kebab-title].pdf
   e.g. kingm-2008-addisons-diagnostic-manual.pdf
 - Optionally adds tags/keywords (CSV or list) to the metadata Keywords field.
+- Caches per-file metadata/inference in ~/.cache/pdf-tools/meta-cache.json keyed on path, mtime and size (--no-cache to bypass).
 - Defaults to dry-run; use --apply to perform metadata writes and renames. Writes a CSV plan/log for auditing and undo.
 
 Requirements: PyMuPDF (pip install pymupdf)
@@ -18,11 +19,16 @@ import argparse
 import csv
 import datetime
 import hashlib
+import os
 import re
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from pdf_utils import CACHE_DIR, dir_names, load_meta_cache, save_in_place, save_meta_cache
 
 try:
     import fitz  # PyMuPDF
@@ -44,50 +50,110 @@ class PlanRow:
     action: str
 
 
+PLAN_COLUMNS = [f.name for f in fields(PlanRow)]
+# PlanRow -> tuple in column order (plain attribute access; dataclasses.astuple deep-copies)
+_plan_values = attrgetter(*PLAN_COLUMNS)
+
+
+_KEBAB_NONALNUM = re.compile(r"[^a-z0-9]+")
+_KEBAB_DASHES = re.compile(r"-+")
+_YEAR_RE = re.compile(r"\b(19\d{2}|20[0-4]\d|2050)\b")
+_WS_RE = re.compile(r"\s+")
+_BY_RE = re.compile(r"^by\s+(.+)$", re.I)
+_ET_AL = re.compile(r"et\s+al\.?", re.I)
+_AND_TAIL = re.compile(r"\band\b.*$", re.I)
+_AUTHOR_SEP = re.compile(r"[\n/\\|]")
+_DOT_COMMA = re.compile(r"\.|,")
+_NON_ALPHA = re.compile(r"[^A-Za-z]")
+_STEM_SUFFIX = re.compile(r"[-_]+(draft|v\d+|final)$", re.I)
+_STEM_YEAR = re.compile(r"(19\d{2}|20\d{2})")
+
+
+# ASCII chars that aren't [a-z0-9] after lower() -> '-'
+_KEBAB_TBL = str.maketrans({c: '-' for c in map(chr, range(128)) if not c.isalnum()})
+
+
 def kebab(s: str) -> str:
+    if s.isascii():
+        # common case: translate + split/join collapses runs and trims the ends without the regex engine
+        parts = s.lower().translate(_KEBAB_TBL).split('-')
+        return '-'.join(p for p in parts if p)[:240]
+    return _kebab_regex(s)
+
+
+def _kebab_regex(s: str) -> str:
     s = s.lower()
-    s = re.sub(r"[^a-z0-9]+", "-", s)
-    s = re.sub(r"-+", "-", s)
+    s = _KEBAB_NONALNUM.sub("-", s)
+    s = _KEBAB_DASHES.sub("-", s)
     s = s.strip("-")
     return s[:240]
 
 
+MAX_HEAD_LINES = 20
+
+
+def _first_page_head(page) -> Tuple[List[str], Optional[str]]:
+    """Return (first non-empty lines, first year) from a page's text blocks.
+
+    Blocks come in reading order, so we stop as soon as we have MAX_HEAD_LINES lines and a year
+    instead of copying out the whole page text.
+    """
+    lines: List[str] = []
+    year = None
+    for block in page.get_text("blocks"):
+        if block[6] != 0:  # image block
+            continue
+        text = block[4]
+        if year is None:
+            # Heuristics: find year (4-digit between 1900 and 2050)
+            year_match = _YEAR_RE.search(text)
+            if year_match:
+                year = year_match.group(0)
+        lines.extend(ln.strip() for ln in text.splitlines() if ln.strip())
+        if year is not None and len(lines) >= MAX_HEAD_LINES:
+            break
+    return lines, year
+
+
 def infer_from_first_page(pdf_path: Path) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """Try to extract title, author, year from the first page text heuristically."""
     try:
         doc = fitz.open(pdf_path)
+    except Exception:
+        return None, None, None
+    with doc:
+        return infer_from_doc(doc)
+
+
+def infer_from_doc(doc) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """infer_from_first_page for an already open document."""
+    try:
         if doc.page_count == 0:
             return None, None, None
-        text = doc.load_page(0).get_text("text")
-        doc.close()
+        lines, year = _first_page_head(doc.load_page(0))
     except Exception:
         return None, None, None
 
-    # Heuristics: find year (4-digit between 1900 and 2050)
-    year_match = re.search(r"\b(19\d{2}|20[0-4]\d|2050)\b", text)
-    year = year_match.group(0) if year_match else None
-
     # Title: take first non-empty line of at least 5 chars
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
     title = None
     if lines:
         # prefer first 1-3 lines joined if short
         candidate = lines[0]
         if len(candidate) < 30 and len(lines) > 1:
             candidate = candidate + " " + lines[1]
-        title = re.sub(r"\s+", " ", candidate).strip()
+        title = _WS_RE.sub(" ", candidate).strip()
         if len(title) < 5:
             title = None
 
     # Author: look for lines containing 'by ' or 'author'
     author = None
-    for ln in lines[:20]:
-        m = re.search(r"^by\s+(.+)$", ln, re.I)
+    for ln in lines[:MAX_HEAD_LINES]:
+        m = _BY_RE.search(ln)
         if m:
             author = m.group(1).strip()
             break
     if not author:
-        for ln in lines[:20]:
+        for ln in lines[:MAX_HEAD_LINES]:
             if 'author' in ln.lower():
                 # take trailing words
                 parts = ln.split(':')
@@ -98,6 +164,15 @@ def infer_from_first_page(pdf_path: Path) -> Tuple[Optional[str], Optional[str],
     return title, author, year
 
 
+_AUTHOR_SPECIAL = frozenset(',;/\\|\n')
+# deletes everything but A-Z/a-z; only valid for ASCII input (translate leaves unmapped chars alone)
+_ASCII_ALPHA_ONLY = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isalpha()))
+
+
+def _alpha_only(x: str) -> str:
+    return x.translate(_ASCII_ALPHA_ONLY) if x.isascii() else _NON_ALPHA.sub("", x)
+
+
 def normalize_author(author_raw: Optional[str]) -> Tuple[str, str, str]:
     """Return (lastname, surname_initial, human_readable) for a given raw author string.
 
@@ -112,17 +187,23 @@ def normalize_author(author_raw: Optional[str]) -> Tuple[str, str, str]:
         return "unknown", "u", "Unknown, Unknown"
 
     s = author_raw.strip()
-    # remove common noise
-    s = re.sub(r"et\s+al\.?", "", s, flags=re.I)
-    s = re.sub(r"\band\b.*$", "", s, flags=re.I)
-    s = s.replace(';', ',')
-
-    # split on common separators and prefer the first element as the primary author
-    parts = [p.strip() for p in re.split(r"[\n/\\|]", s) if p.strip()]
-    if not parts:
-        return "unknown", "u", "Unknown, Unknown"
+    low = s.lower()
+    if _AUTHOR_SPECIAL.isdisjoint(s) and 'and' not in low and not ('et' in low and 'al' in low):
+        # fast path (the common single 'First Last' case): none of the noise/separator
+        # regexes below could match, so go straight to the whitespace tokens
+        primary = s
+    else:
+        # remove common noise
+        s = _ET_AL.sub("", s)
+        s = _AND_TAIL.sub("", s)
+        s = s.replace(';', ',')
+
+        # split on common separators and prefer the first element as the primary author
+        parts = [p.strip() for p in _AUTHOR_SEP.split(s) if p.strip()]
+        if not parts:
+            return "unknown", "u", "Unknown, Unknown"
 
-    primary = parts[0]
+        primary = parts[0]
 
     # If primary contains a comma it's likely 'Last, First' or 'Last, F.'
     firstname = None
@@ -132,11 +213,10 @@ def normalize_author(author_raw: Optional[str]) -> Tuple[str, str, str]:
         # left is likely surname, right contains given names/initials
         lastname = left
         # take first token from right as firstname candidate
-        firstname = re.sub(r"\.|,", "", right).split()[0] if right else None
+        firstname = _DOT_COMMA.sub("", right).split()[0] if right else None
     else:
         # normalize hyphens/underscores to spaces then split tokens
-        clean = re.sub(r"[-_]+", " ", primary)
-        tokens = [t for t in clean.split() if t]
+        tokens = primary.replace('-', ' ').replace('_', ' ').split()
         if len(tokens) == 0:
             return "unknown", "u", "Unknown, Unknown"
         if len(tokens) == 1:
@@ -152,8 +232,8 @@ def normalize_author(author_raw: Optional[str]) -> Tuple[str, str, str]:
     firstname = firstname or "Unknown"
     lastname = lastname or "Unknown"
     # sanitize
-    firstname = (re.sub(r"[^A-Za-z]", "", firstname) or "Unknown").strip()
-    lastname = (re.sub(r"[^A-Za-z]", "", lastname) or "Unknown").strip()
+    firstname = (_alpha_only(firstname) or "Unknown").strip()
+    lastname = (_alpha_only(lastname) or "Unknown").strip()
 
     # human-readable metadata: 'Lastname, Firstname'
     human = f"{lastname.title()}, {firstname.title()}"
@@ -199,8 +279,16 @@ def build_target_filename(firstname: str, initial: str, year: Optional[str], tit
 def read_pdf_metadata(path: Path) -> Tuple[str, str, str]:
     try:
         doc = fitz.open(path)
+    except Exception:
+        return '', '', ''
+    with doc:
+        return read_doc_metadata(doc)
+
+
+def read_doc_metadata(doc) -> Tuple[str, str, str]:
+    """(title, author, keywords) of an already open document."""
+    try:
         meta = doc.metadata
-        doc.close()
         author = meta.get('author') or ''
         title = meta.get('title') or ''
         keywords = meta.get('keywords') or ''
@@ -209,116 +297,234 @@ def read_pdf_metadata(path: Path) -> Tuple[str, str, str]:
         return '', '', ''
 
 
-def write_pdf_metadata(path: Path, title: str, author: str, keywords: str) -> None:
+def write_pdf_metadata(path: Path, title: str, author: str, keywords: str, keep_streams: bool = False) -> bool:
+    """Write title/author/keywords; returns False (and skips the save) when nothing changed.
+
+    keep_streams never falls back to a full rewrite, so the original page streams always stay
+    byte-identical (the write fails instead).
+    """
     doc = fitz.open(path)
-    meta = doc.metadata
-    meta['title'] = title
-    meta['author'] = author
-    meta['keywords'] = keywords
-    doc.set_metadata(meta)
-    # save in place
-    doc.save(path, garbage=4, deflate=True)
-    doc.close()
-
-
-def unique_path(p: Path) -> Path:
-    if not p.exists():
-        return p
-    stem = p.stem
-    parent = p.parent
+    try:
+        old = dict(doc.metadata or {})
+        new = {**old, 'title': title, 'author': author, 'keywords': keywords}
+        if new == old:
+            return False
+        doc.set_metadata(new)
+        save_in_place(doc, Path(path), allow_rewrite=not keep_streams)
+        return True
+    finally:
+        doc.close()
+
+
+# casefolded names present in each target directory, listed once and extended as names are
+# handed out; casefolded because the default macOS volume is case-insensitive, where
+# kingM-2008-x.pdf would replace an existing kingm-2008-x.pdf
+def unique_path(p: Path, index: Dict[str, Set[str]], src: Optional[Path] = None) -> Path:
+    """Return p, or p with a -N suffix, whose name is not taken in its directory; the name is then reserved.
+
+    index is the run's casefolded dir_names() cache. src is the file being renamed: its own name does not
+    count as taken (a case-only rename).
+    """
+    names = dir_names(os.fspath(p.parent), index, casefold=True)
+    own = src.name.casefold() if src is not None and src.parent == p.parent else None
+    candidate = p
     i = 2
-    while True:
-        candidate = parent / f"{stem}-{i}{p.suffix}"
-        if not candidate.exists():
-            return candidate
+    while candidate.name.casefold() in names and candidate.name.casefold() != own:
+        candidate = p.parent / f"{p.stem}-{i}{p.suffix}"
         i += 1
+    names.add(candidate.name.casefold())
+    return candidate
 
 
-def process_folder(root: Path, tags: List[str], apply: bool = False) -> List[PlanRow]:
-    rows: List[PlanRow] = []
-    now = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
-    for p in root.rglob('*'):
-        if not p.is_file():
-            continue
-        if p.suffix.lower() != '.pdf':
+def default_workers() -> int:
+    return min(32, os.cpu_count() or 1)
+
+
+def _map(fn, items, workers: int):
+    """Run fn over items in order, in a process pool when workers > 1."""
+    if workers <= 1 or len(items) <= 1:
+        return [fn(it) for it in items]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, items, chunksize=8))
+
+
+def iter_pdfs(root) -> Iterator[str]:
+    """Yield paths (as str) of every *.pdf under root, case-insensitive, without following symlinked dirs."""
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith('.pdf'):
+                    yield entry.path
 
-        title_meta, author_meta, keywords_meta = read_pdf_metadata(p)
-        title = title_meta or None
-        author = author_meta or None
-        year = None
-
-        if not title or not author:
-            t2, a2, y2 = infer_from_first_page(p)
-            title = title or t2
-            author = author or a2
-            year = year or y2
-
-        # fallback to filename parsing for title/year
-        if not title:
-            # strip suffixes like -draft etc
-            title = re.sub(r"[-_]+(draft|v\d+|final)$", "", p.stem, flags=re.I)
-            title = title.replace('-', ' ')
-
-        # try to extract year from filename if still missing
-        if not year:
-            m = re.search(r"(19\d{2}|20\d{2})", p.stem)
-            if m:
-                year = m.group(0)
-
-        # normalize author
-        lastname, initial, human = normalize_author(author)
-
-        # requested format filename: lastname + capitalized first initial
-        proposed_name = build_target_filename(lastname, initial, year, title)
-        proposed_path = p.parent / proposed_name
-        if proposed_path.exists() and proposed_path.samefile(p):
-            action = 'noop'
+
+META_CACHE = CACHE_DIR / 'meta-cache.json'
+
+
+def _plan_one(job: Tuple[str, List[str], Optional[dict]]) -> Tuple[PlanRow, Optional[dict]]:
+    """Plan one file; returns the row and a fresh cache entry (None when the cached one was reused)."""
+    path, tags, cached = job
+    p = Path(path)
+    year_fn = _STEM_YEAR.search(p.stem)
+    t2 = a2 = y2 = None
+    try:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    # cache entries are only trusted while the file's mtime and size are unchanged
+    if cached is None or stamp is None or (cached.get('mtime_ns'), cached.get('size')) != stamp:
+        cached = None
+    meta = cached.get('meta') if cached else None
+    inferred = cached.get('infer') if cached else None
+    entry = None
+    if meta is not None and (inferred is not None or (meta[0] and meta[1])):
+        title_meta, author_meta, keywords_meta = meta
+        if inferred is not None:
+            t2, a2, y2 = inferred
+    else:
+        # one open per file: metadata and (if needed) first-page inference share the parsed doc
+        try:
+            doc = fitz.open(path)
+        except Exception:
+            doc = None
+        if doc is None:
+            title_meta, author_meta, keywords_meta = '', '', ''
         else:
-            if proposed_path.exists():
-                proposed_path = unique_path(proposed_path)
-            action = 'rename'
-
-        # tags -> keywords concat
-        existing_keywords = keywords_meta or ''
-        extra = ','.join(tags) if tags else ''
-        proposed_keywords = ','.join([kw for kw in [existing_keywords, extra] if kw])
-
-        row = PlanRow(
-            original_path=str(p),
-            proposed_path=str(proposed_path),
-            original_author=author_meta or '',
-            proposed_author=human,
-            original_title=title_meta or '',
-            proposed_title=title or '',
-            original_keywords=existing_keywords,
-            proposed_keywords=proposed_keywords,
-            action=action,
-        )
+            with doc:
+                title_meta, author_meta, keywords_meta = read_doc_metadata(doc)
+                # page text extraction is the expensive step: only do it when title or author is
+                # genuinely unknown; a missing year alone is taken from the filename below
+                if not title_meta or not author_meta:
+                    t2, a2, y2 = infer_from_doc(doc)
+                    inferred = [t2, a2, y2]
+            if stamp is not None:
+                entry = {'mtime_ns': stamp[0], 'size': stamp[1],
+                         'meta': [title_meta, author_meta, keywords_meta]}
+                if inferred is not None:
+                    entry['infer'] = inferred
+    title = title_meta or t2
+    author = author_meta or a2
+    year = y2
+
+    # fallback to filename parsing for title/year
+    if not title:
+        # strip suffixes like -draft etc
+        title = _STEM_SUFFIX.sub("", p.stem)
+        title = title.replace('-', ' ')
+
+    # try to extract year from filename if still missing
+    if not year and year_fn:
+        year = year_fn.group(0)
+
+    # normalize author
+    lastname, initial, human = normalize_author(author)
+
+    # requested format filename: lastname + capitalized first initial
+    proposed_name = build_target_filename(lastname, initial, year, title)
+    proposed_path = p.parent / proposed_name
+    # a free name is picked later in process_folder, where every row's choice is visible
+    if proposed_path.exists() and proposed_path.samefile(p):
+        action = 'noop'
+    else:
+        action = 'rename'
+
+    # tags -> keywords concat
+    existing_keywords = keywords_meta or ''
+    extra = ','.join(tags) if tags else ''
+    proposed_keywords = ','.join([kw for kw in [existing_keywords, extra] if kw])
+
+    row = PlanRow(
+        original_path=path,
+        proposed_path=str(proposed_path),
+        original_author=author_meta or '',
+        proposed_author=human,
+        original_title=title_meta or '',
+        proposed_title=title or '',
+        original_keywords=existing_keywords,
+        proposed_keywords=proposed_keywords,
+        action=action,
+    )
+    return row, entry
+
+
+def _apply_one(job: Tuple[PlanRow, bool]) -> List[str]:
+    """Write metadata then rename; returns warnings for the caller to print."""
+    row, keep_streams = job
+    warnings = []
+    p = Path(row.original_path)
+    try:
+        write_pdf_metadata(p, row.proposed_title, row.proposed_author, row.proposed_keywords,
+                           keep_streams=keep_streams)
+    except Exception as e:
+        warnings.append(f"Warning: failed to write metadata for {p}: {e}")
+    try:
+        p.rename(Path(row.proposed_path))
+    except Exception as e:
+        warnings.append(f"Warning: failed to rename {p} -> {row.proposed_path}: {e}")
+    return warnings
+
+
+def process_folder(root: Path, tags: List[str], apply: bool = False, workers: Optional[int] = None,
+                   keep_streams: bool = False, cache_path: Optional[Path] = META_CACHE) -> List[PlanRow]:
+    if workers is None:
+        workers = default_workers()
+    paths = list(iter_pdfs(root))
+    keys = [os.path.abspath(p) for p in paths]
+    cache = load_meta_cache(cache_path) if cache_path else {}
+
+    # plan every file in parallel (pure: reads only), keeping scan order
+    results = _map(_plan_one, [(p, tags, cache.get(k)) for p, k in zip(paths, keys)], workers)
+    rows: List[PlanRow] = []
+    dirty = False
+    for k, (row, entry) in zip(keys, results):
         rows.append(row)
+        if entry is not None:
+            cache[k] = entry
+            dirty = True
+    # forget files under root that this scan no longer found (deleted or renamed elsewhere)
+    prefix = os.path.join(os.path.abspath(root), '')
+    seen = set(keys)
+    for k in [k for k in cache if k.startswith(prefix) and k not in seen]:
+        del cache[k]
+        dirty = True
+
+    # resolve collisions serially against a per-directory name set instead of stat'ing candidates;
+    # each chosen name is reserved so later rows in the same directory see it
+    dir_index: Dict[str, Set[str]] = {}
+    for row in rows:
+        if row.action == 'rename':
+            row.proposed_path = str(unique_path(Path(row.proposed_path), dir_index, Path(row.original_path)))
+
+    if apply:
+        # metadata save is the long pole; targets are distinct so the renames can run concurrently
+        jobs = [(r, keep_streams) for r in rows if r.action == 'rename']
+        for warnings in _map(_apply_one, jobs, workers):
+            for w in warnings:
+                print(w, file=sys.stderr)
+        # applied files were rewritten and moved, so their entries can never hit again
+        for r in rows:
+            if r.action == 'rename' and cache.pop(os.path.abspath(r.original_path), None) is not None:
+                dirty = True
 
-        if apply and action == 'rename':
-            # write metadata then rename
-            try:
-                write_pdf_metadata(p, row.proposed_title, row.proposed_author, row.proposed_keywords)
-            except Exception as e:
-                print(f"Warning: failed to write metadata for {p}: {e}", file=sys.stderr)
-            try:
-                p.rename(Path(row.proposed_path))
-            except Exception as e:
-                print(f"Warning: failed to rename {p} -> {row.proposed_path}: {e}", file=sys.stderr)
-
+    if cache_path and dirty:
+        save_meta_cache(cache, cache_path)
     return rows
 
 
 def write_csv_log(rows: List[PlanRow], root: Path) -> Path:
     now = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
     out = root / f"metadata-rename-plan-{now}.csv"
-    with out.open('w', newline='', encoding='utf-8') as fh:
+    with out.open('w', newline='', encoding='utf-8', buffering=1 << 20) as fh:
         w = csv.writer(fh)
-        w.writerow(['original_path', 'proposed_path', 'original_author', 'proposed_author', 'original_title', 'proposed_title', 'original_keywords', 'proposed_keywords', 'action'])
-        for r in rows:
-            w.writerow([r.original_path, r.proposed_path, r.original_author, r.proposed_author, r.original_title, r.proposed_title, r.original_keywords, r.proposed_keywords, r.action])
+        w.writerow(PLAN_COLUMNS)
+        w.writerows(map(_plan_values, rows))
     return out
 
 
@@ -327,6 +533,9 @@ def main(argv: Optional[List[str]] = None) -> int:
     p.add_argument('root', nargs='?', default=str(Path.home() / 'Documents' / 'clinic' / 'research-articles' / 'flat-20250919-210028'))
     p.add_argument('--tags', '-t', nargs='*', default=[], help='Tags/keywords to add to the Keywords metadata (comma will be preserved)')
     p.add_argument('--apply', action='store_true', help='Apply changes (write metadata and rename). Default: dry-run')
+    p.add_argument('--workers', type=int, default=None, help='Parallel worker processes (default: CPU count, max 32; 1 = serial)')
+    p.add_argument('--keep-streams', action='store_true', help='Never fall back to rewriting the whole PDF when an incremental metadata update is refused')
+    p.add_argument('--no-cache', action='store_true', help=f'Do not read or update the metadata cache ({META_CACHE})')
     args = p.parse_args(argv)
 
     root = Path(args.root).expanduser()
@@ -334,7 +543,9 @@ def main(argv: Optional[List[str]] = None) -> int:
         print(f"Root folder {root} does not exist", file=sys.stderr)
         return 2
 
-    rows = process_folder(root, args.tags, apply=args.apply)
+    rows = process_folder(root, args.tags, apply=args.apply, workers=args.workers,
+                          keep_streams=args.keep_streams,
+                          cache_path=None if args.no_cache else META_CACHE)
     csv_path = write_csv_log(rows, root)
     # print summary
     print(f"Planned items: {len(rows)}; log: {csv_path}")
@@ -11,30 +11,32 @@ Usage:
 """
 import argparse
 import csv
+import errno
+import os
 from pathlib import Path
 
-try:
-    import fitz
-except Exception:
-    fitz = None
+from pdf_utils import (CACHE_DIR, PLAN_AUTHOR_COLUMNS, PLAN_PATH_COLUMNS, PLAN_TITLE_COLUMNS,
+                       column_positions, dir_names, first_cell, get_pdf_metadata_many, print_samples)
 
+CACHE_PATH = CACHE_DIR / "verify-csv-meta.json"
 
-def get_pdf_metadata(path: Path):
-    if fitz is None:
-        return {}
-    try:
-        d = fitz.open(str(path))
-        md = d.metadata or {}
-        d.close()
-        return {k.lower(): (v or "").strip() for k, v in md.items()}
-    except Exception as e:
-        return {"_error": str(e)}
+# longest allowed file name; over-long basenames are rejected without a syscall
+try:
+    NAME_MAX = os.pathconf("/", "PC_NAME_MAX")
+except (AttributeError, OSError, ValueError):
+    NAME_MAX = 255
+ENAMETOOLONG_MSG = f"[Errno {errno.ENAMETOOLONG}] {os.strerror(errno.ENAMETOOLONG)}"
 
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("csv", type=str)
     p.add_argument("--sample", type=int, default=10)
+    p.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8),
+                   help="Worker processes for reading PDF metadata (1 = serial)")
+    p.add_argument("--cache", type=str, default=str(CACHE_PATH),
+                   help="Metadata cache keyed on path, mtime and size (default: %(default)s)")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or update the metadata cache")
     args = p.parse_args()
 
     csvp = Path(args.csv)
@@ -42,73 +44,76 @@ def main():
         print("CSV not found:", csvp)
         return
 
-    rows = []
-    with csvp.open("r", newline="") as f:
-        rdr = csv.DictReader(f)
-        for r in rdr:
-            rows.append(r)
-
-    total = len(rows)
+    total = 0
     filename_missing = []
-    filename_mismatch = []
     meta_author_mismatch = []
     meta_title_mismatch = []
     filename_errors = []
 
-    for r in rows:
-        prop = r.get("proposed_path") or r.get("new_path") or r.get("proposed") or r.get("target_path")
-        prop_author = r.get("proposed_author") or r.get("author")
-        prop_title = r.get("proposed_title") or r.get("title")
-        if not prop:
-            continue
-        ppath = Path(prop)
-        try:
-            exists = ppath.exists()
-        except OSError as e:
-            filename_errors.append((prop, str(e), r))
-            continue
-        if not exists:
-            filename_missing.append((prop, r))
-            continue
-        # actual filename check (redundant but kept for parity)
-        try:
-            if ppath.name != Path(prop).name:
-                filename_mismatch.append((str(ppath), r))
-        except OSError as e:
-            filename_errors.append((prop, str(e), r))
-            continue
-        # metadata
-        md = get_pdf_metadata(ppath)
+    # pass 1 (streamed): filesystem checks; collect the rows whose metadata needs reading
+    to_check = []
+    dir_index = {}
+    with csvp.open("r", newline="") as f:
+        rdr = csv.reader(f)
+        fieldnames = next(rdr, [])
+        path_cols = column_positions(fieldnames, PLAN_PATH_COLUMNS)
+        author_cols = column_positions(fieldnames, PLAN_AUTHOR_COLUMNS)
+        title_cols = column_positions(fieldnames, PLAN_TITLE_COLUMNS)
+        for row in rdr:
+            if not row:
+                continue
+            total += 1
+            prop = first_cell(row, path_cols)
+            prop_author = first_cell(row, author_cols).strip()
+            prop_title = first_cell(row, title_cols).strip()
+            if not prop:
+                continue
+            if len(os.fsencode(os.path.basename(prop))) > NAME_MAX:
+                filename_errors.append((prop, f"{ENAMETOOLONG_MSG}: {prop!r}"))
+                continue
+            # one scandir per parent directory; names not listed there get a single os.stat,
+            # which tells a missing file apart from OSErrors such as ENAMETOOLONG
+            if os.path.basename(prop) not in dir_names(os.path.dirname(prop), dir_index):
+                try:
+                    os.stat(prop)
+                except (FileNotFoundError, NotADirectoryError):
+                    filename_missing.append((prop,))
+                    continue
+                except OSError as e:
+                    filename_errors.append((prop, str(e)))
+                    continue
+            # nothing to compare: don't pay for opening the PDF
+            if not (prop_author or prop_title):
+                continue
+            to_check.append((prop, prop_author, prop_title))
+
+    # pass 2: metadata (cached / deduplicated / parallel), compared in this process
+    cache_path = None if args.no_cache else Path(args.cache).expanduser()
+    mds = get_pdf_metadata_many([c[0] for c in to_check], workers=args.workers, cache_path=cache_path)
+
+    for (path, prop_author, prop_title), md in zip(to_check, mds):
         if md.get("_error"):
             # metadata read failed; record as filename_errors for attention
-            filename_errors.append((str(ppath), md.get("_error"), r))
+            filename_errors.append((path, md.get("_error")))
             continue
+        # both sides are pre-stripped: CSV values when read, PDF values by get_pdf_metadata
         author = md.get("author", "")
         title = md.get("title", "")
-        if prop_author and prop_author.strip() and prop_author.strip() != author.strip():
-            meta_author_mismatch.append((str(ppath), prop_author, author))
-        if prop_title and prop_title.strip() and prop_title.strip() != title.strip():
-            meta_title_mismatch.append((str(ppath), prop_title, title))
+        if prop_author and prop_author != author:
+            meta_author_mismatch.append((path, prop_author, author))
+        if prop_title and prop_title != title:
+            meta_title_mismatch.append((path, prop_title, title))
 
     print(f"Rows checked: {total}")
     print(f"Files missing (proposed path doesn't exist): {len(filename_missing)}")
-    print(f"Filename mismatches: {len(filename_mismatch)}")
     print(f"Author metadata mismatches: {len(meta_author_mismatch)}")
     print(f"Title metadata mismatches: {len(meta_title_mismatch)}")
     print(f"Filename / metadata read errors (OSError or read failure): {len(filename_errors)}")
 
-    def show_samples(lst, name):
-        if not lst:
-            return
-        print(f"\nSample {name} (up to {args.sample}):")
-        for item in lst[:args.sample]:
-            print(item)
-
-    show_samples(filename_errors, "filename/metadata errors")
-    show_samples(filename_missing, "missing files")
-    show_samples(filename_mismatch, "filename mismatches")
-    show_samples(meta_author_mismatch, "author metadata mismatches")
-    show_samples(meta_title_mismatch, "title metadata mismatches")
+    print_samples(filename_errors, "filename/metadata errors", args.sample)
+    print_samples(filename_missing, "missing files", args.sample)
+    print_samples(meta_author_mismatch, "author metadata mismatches", args.sample)
+    print_samples(meta_title_mismatch, "title metadata mismatches", args.sample)
 
 
 if __name__ == '__main__':
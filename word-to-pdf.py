@@ -10,9 +10,17 @@ Usage:
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
-from pdf_utils import word_to_pdf
+from pdf_utils import word_to_pdf, word_to_pdf_batch
+
+
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
 
 
 def main():
@@ -23,6 +31,8 @@ def main():
     parser.add_argument('input', nargs='+', help='Word document(s) to convert')
     parser.add_argument('-o', '--output', help='Output PDF path (single file only)')
     parser.add_argument('--overwrite', action='store_true', help='Overwrite existing PDFs')
+    parser.add_argument('--workers', type=positive_int, default=min(os.cpu_count() or 1, 4),
+                        help='Concurrent LibreOffice instances in batch mode (default: CPU count, max 4)')
     
     args = parser.parse_args()
     
@@ -46,9 +56,11 @@ def main():
             print(f"❌ Conversion failed")
             return 1
     
-    # Batch mode
+    # Batch mode: filter first, then convert each output directory in one (sharded) LibreOffice run
     success_count = 0
     fail_count = 0
+    by_dir = {}
+    planned = set()
     
     for input_path_str in args.input:
         docx_path = Path(input_path_str)
@@ -70,13 +82,27 @@ def main():
             fail_count += 1
             continue
         
-        print(f"📄 Converting: {docx_path.name}")
-        if word_to_pdf(str(docx_path), str(output_path)):
-            print(f"  ✅ {output_path.name}")
-            success_count += 1
-        else:
-            print(f"  ❌ Failed")
+        # report.doc and report.docx would both become report.pdf: convert only the first
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in planned:
+            print(f"⚠️  Skipping (same output as an earlier input): {docx_path}")
             fail_count += 1
+            continue
+        planned.add(key)
+        
+        by_dir.setdefault(str(output_path.parent), []).append(docx_path)
+    
+    for outdir, docx_paths in by_dir.items():
+        for docx_path in docx_paths:
+            print(f"📄 Converting: {docx_path.name}")
+        results = word_to_pdf_batch([str(p) for p in docx_paths], outdir, workers=args.workers)
+        for docx_path in docx_paths:
+            if results[str(docx_path)]:
+                print(f"  ✅ {docx_path.with_suffix('.pdf').name}")
+                success_count += 1
+            else:
+                print(f"  ❌ Failed: {docx_path.name}")
+                fail_count += 1
     
     print(f"\n📊 Results: {success_count} converted, {fail_count} failed")
     return 0 if fail_count == 0 else 1